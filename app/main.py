@@ -1,5 +1,6 @@
 import streamlit as st
 import pandas as pd
+import pyarrow.parquet as pq
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
@@ -9,10 +10,38 @@ st.set_page_config(
     page_icon='💱'
 )
 
+principais = ['USD', 'EUR', 'GBP']
+brics = ['CNY', 'INR', 'RUB', 'ZAR']
+
 @st.cache_data
 def load_data(ttl='3h'):
     return pd.read_parquet('data/gold/gold.parquet')
 
+@st.cache_data
+def load_piramide(ttl='3h'):
+    path = 'data/gold/gold_piramide.parquet'
+    # Pontos por série enviados ao navegador, gravado pelo gold junto com a pirâmide
+    pontos_alvo = int(pq.read_schema(path).metadata[b'pontos_alvo'])
+    return pd.read_parquet(path, filters=[('moeda', 'in', principais + brics)]), pontos_alvo
+
+def serie_no_intervalo(df, piramide, pontos_alvo, moeda, inicio, fim):
+    """Escolhe o nível mais resumido da pirâmide que ainda tem pontos_alvo pontos no intervalo"""
+    dados = piramide[
+        (piramide['moeda'] == moeda) &
+        (piramide['timestamp'] >= inicio) &
+        (piramide['timestamp'] < fim)
+    ]
+    contagem = dados.groupby('nivel').size()
+    suficientes = contagem[contagem >= pontos_alvo]
+    if suficientes.empty:
+        # Nível 0: a série completa vem do próprio gold
+        return df[
+            (df['moeda'] == moeda) &
+            (df['timestamp'] >= inicio) &
+            (df['timestamp'] < fim)
+        ].sort_values('timestamp')
+    return dados[dados['nivel'] == suficientes.index.max()].sort_values('timestamp')
+
 def carregar_insight_do_dia(data_referencia):
     df = pd.read_parquet('data/gold/insights_diarios.parquet')
     insight = df[df['data'].dt.date == pd.to_datetime(data_referencia).date()]
@@ -54,8 +83,18 @@ if insight_texto:
 else:
     st.info("Insight diário ainda não disponível para hoje.")
 
-principais = ['USD', 'EUR', 'GBP']
-brics = ['CNY', 'INR', 'RUB', 'ZAR']
+piramide, pontos_alvo = load_piramide()
+data_minima = df['timestamp'].min()
+
+intervalo = st.date_input(
+    'Período dos gráficos',
+    value=(data_minima.date(), data_maxima.date()),
+    min_value=data_minima.date(),
+    max_value=data_maxima.date(),
+    format='DD/MM/YYYY'
+)
+inicio = pd.Timestamp(intervalo[0]) if len(intervalo) > 0 else data_minima.normalize()
+fim = pd.Timestamp(intervalo[1] if len(intervalo) > 1 else data_maxima.date()) + pd.Timedelta(days=1)
 
 tab1, tab2, tab3 = st.tabs(["Média Móvel - Principais", "Média Móvel - BRICS", 'Base de Dados'])
 
@@ -63,7 +102,7 @@ with tab1:
     fig_principais = make_subplots(rows=1, cols=3, subplot_titles=principais)
     
     for i, moeda in enumerate(principais):
-        dados_moeda = df[df['moeda'] == moeda].sort_values('timestamp')
+        dados_moeda = serie_no_intervalo(df, piramide, pontos_alvo, moeda, inicio, fim)
         fig_principais.add_trace(go.Scatter(x=dados_moeda['timestamp'], y=dados_moeda['taxa'], mode='lines', showlegend=False), row=1, col=i+1)
         fig_principais.add_trace(go.Scatter(x=dados_moeda['timestamp'], y=dados_moeda['ma_7d'], mode='lines', line=dict(dash='dash', color='gray'), showlegend=False), row=1, col=i+1)
     
@@ -76,7 +115,7 @@ with tab2:
     for i, moeda in enumerate(brics):
         row = (i // 2) + 1
         col = (i % 2) + 1
-        dados_moeda = df[df['moeda'] == moeda].sort_values('timestamp')
+        dados_moeda = serie_no_intervalo(df, piramide, pontos_alvo, moeda, inicio, fim)
         fig_brics.add_trace(go.Scatter(x=dados_moeda['timestamp'], y=dados_moeda['taxa'], mode='lines', showlegend=False), row=row, col=col)
         fig_brics.add_trace(go.Scatter(x=dados_moeda['timestamp'], y=dados_moeda['ma_7d'], mode='lines', line=dict(dash='dash', color='gray'), showlegend=False), row=row, col=col)
     
@@ -0,0 +1,81 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+import pandas as pd
+from transform.transform_silver import LINHAS_POR_GRUPO
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def montar_historico(destino, replicas):
+    """Cria um silver com o histórico real repetido `replicas` vezes, deslocado no tempo"""
+    origem = os.path.join(BASE_DIR, 'data', 'silver')
+    os.makedirs(os.path.join(destino, 'data', 'silver'), exist_ok=True)
+    shutil.copy(os.path.join(origem, 'currency_code_country.csv'), os.path.join(destino, 'data', 'silver'))
+
+    df = pd.read_parquet(os.path.join(origem, 'silver.parquet'))
+    periodo = df['timestamp'].max() - df['timestamp'].min() + pd.Timedelta(days=1)
+    partes = [df.assign(timestamp=df['timestamp'] - periodo * k) for k in range(replicas)]
+    silver = pd.concat(partes, ignore_index=True).sort_values(['moeda', 'timestamp']).reset_index(drop=True)
+    silver.to_parquet(os.path.join(destino, 'data', 'silver', 'silver.parquet'), index=False, row_group_size=LINHAS_POR_GRUPO)
+    return len(silver)
+
+def executar(base_dir, max_workers):
+    """Roda o gold uma vez e imprime tempo e pico de memória em JSON (processo filho)"""
+    from load.transform_gold import main as gold_main
+    inicio = time.perf_counter()
+    gold_main(max_workers=max_workers, base_dir=base_dir)
+    duracao = time.perf_counter() - inicio
+    print(json.dumps({
+        'segundos': duracao,
+        # ru_maxrss é em KB no Linux; para filhos é o maior worker, não a soma
+        'rss_pai_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'rss_worker_mb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+    }))
+
+def em_subprocesso(*args):
+    # No Linux o pico de memória (ru_maxrss) sobrevive ao exec, então o processo que monta
+    # o histórico e cada medição rodam à parte, para nenhum herdar o pico do outro
+    saida = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), *map(str, args)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(saida.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do gold: tempo por processos e memória por tamanho do histórico')
+    parser.add_argument('--replicas', type=int, nargs='+', default=[1, 5, 10, 20])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--executar', nargs=2, help=argparse.SUPPRESS)
+    parser.add_argument('--montar', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.executar:
+        return executar(args.executar[0], int(args.executar[1]))
+    if args.montar:
+        return print(json.dumps(montar_historico(args.montar[0], int(args.montar[1]))))
+
+    logger.info(f"CPUs disponíveis: {os.cpu_count()}")
+    for replicas in args.replicas:
+        with tempfile.TemporaryDirectory() as destino:
+            registros = em_subprocesso('--montar', destino, replicas)
+            for max_workers in args.workers:
+                r = em_subprocesso('--executar', destino, max_workers)
+                logger.info(
+                    f"histórico={replicas:>3}x ({registros:>9,} registros) processos={max_workers}: "
+                    f"{r['segundos']:.2f} s, pico RSS pai={r['rss_pai_mb']:.0f} MB, "
+                    f"maior worker={r['rss_worker_mb']:.0f} MB"
+                )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# Quantidade de pontos por série que o dashboard envia ao navegador
+PONTOS_ALVO = 500
+
+SCHEMA_PIRAMIDE = pa.schema([
+    ('moeda', pa.string()),
+    ('nivel', pa.int64()),
+    ('timestamp', pa.timestamp('ns')),
+    ('taxa', pa.float64()),
+    ('ma_7d', pa.float64()),
+], metadata={'pontos_alvo': str(PONTOS_ALVO)})
+
+def lttb(x, y, n_pontos):
+    """Retorna os índices escolhidos pelo Largest-Triangle-Three-Buckets"""
+    n = len(x)
+    if n_pontos >= n or n_pontos < 3:
+        return np.arange(n)
+
+    # Primeiro e último ponto sempre ficam; o miolo é dividido em n_pontos - 2 baldes
+    limites = np.linspace(1, n - 1, n_pontos - 1).astype(int)
+    indices = np.empty(n_pontos, dtype=int)
+    indices[0] = 0
+    indices[-1] = n - 1
+
+    anterior = 0
+    for i in range(n_pontos - 2):
+        inicio, fim = limites[i], limites[i + 1]
+        # Média do próximo balde (ou o último ponto) como terceiro vértice do triângulo
+        if i < n_pontos - 3:
+            prox_inicio, prox_fim = limites[i + 1], limites[i + 2]
+            x_medio = x[prox_inicio:prox_fim].mean()
+            y_medio = y[prox_inicio:prox_fim].mean()
+        else:
+            x_medio, y_medio = x[-1], y[-1]
+
+        areas = np.abs(
+            (x[anterior] - x_medio) * (y[inicio:fim] - y[anterior])
+            - (x[anterior] - x[inicio:fim]) * (y_medio - y[anterior])
+        )
+        anterior = inicio + int(np.argmax(areas))
+        indices[i + 1] = anterior
+
+    return indices
+
+def construir_piramide(df, pontos_alvo=PONTOS_ALVO):
+    """Gera os níveis resumidos (1 em diante) de taxa e ma_7d para os dados de uma moeda"""
+    df = df.sort_values('timestamp').reset_index(drop=True)
+    x = df['timestamp'].astype('int64').to_numpy(dtype=float)
+    y = df['taxa'].to_numpy(dtype=float)
+
+    # O nível 0 é a série completa, lida do próprio gold; cada nível seguinte tem
+    # metade dos pontos, até pontos_alvo
+    niveis = []
+    n, nivel = len(df), 0
+    while n > pontos_alvo:
+        nivel += 1
+        n = max(pontos_alvo, -(-len(df) // 2 ** nivel))
+        niveis.append(df.iloc[lttb(x, y, n)].assign(nivel=nivel))
+
+    if not niveis:
+        return SCHEMA_PIRAMIDE.empty_table()
+    piramide = pd.concat(niveis, ignore_index=True)
+    return pa.Table.from_pandas(piramide, schema=SCHEMA_PIRAMIDE, preserve_index=False)
@@ -3,6 +3,13 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from load.downsample import construir_piramide, SCHEMA_PIRAMIDE
 from utils.logger import setup_logger
 
 logger = setup_logger(__name__)
@@ -65,18 +72,108 @@ def classificar_volatilidade(volatilidade_7d):
     else:
         return 'estável'
 
-def main():
+# Registros por lote de moedas processado em um worker e por grupo de linhas do gold
+LINHAS_POR_LOTE = 65_536
+
+# Colunas calculadas no gold, na ordem em que são gravadas
+COLUNAS_GOLD = [
+    ('var_1d', pa.float64()),
+    ('var_7d', pa.float64()),
+    ('var_30d', pa.float64()),
+    ('ma_7d', pa.float64()),
+    ('ma_30d', pa.float64()),
+    ('volatilidade_7d', pa.float64()),
+    ('volatilidade_30d', pa.float64()),
+    ('diff_ma_7d', pa.float64()),
+    ('diff_ma_30d', pa.float64()),
+    ('dias_consecutivos', pa.int64()),
+    ('tendencia', pa.string()),
+    ('intensidade_tendencia', pa.string()),
+    ('momentum', pa.string()),
+    ('status_ma_7d', pa.string()),
+    ('status_ma_30d', pa.string()),
+    ('categoria_variacao', pa.string()),
+    ('nm_moeda', pa.string()),
+    ('nm_pais_en', pa.string()),
+]
+
+def calcular_indicadores(df):
+    """Calcula os indicadores do gold para os dados de uma moeda"""
+    df = df.sort_values(['moeda', 'timestamp'])
+    
+    # Calcular variações percentuais
+    df['var_1d'] = df.groupby('moeda')['taxa'].pct_change(1) * 100
+    df['var_7d'] = df.groupby('moeda')['taxa'].pct_change(7) * 100
+    df['var_30d'] = df.groupby('moeda')['taxa'].pct_change(30) * 100
+    
+    # Calcular médias móveis
+    df['ma_7d'] = df.groupby('moeda')['taxa'].rolling(window=7, min_periods=1).mean().reset_index(0, drop=True)
+    df['ma_30d'] = df.groupby('moeda')['taxa'].rolling(window=30, min_periods=1).mean().reset_index(0, drop=True)
+    
+    # Calcular volatilidade
+    df['volatilidade_7d'] = df.groupby('moeda')['taxa'].rolling(window=7, min_periods=2).std().reset_index(0, drop=True)
+    df['volatilidade_30d'] = df.groupby('moeda')['taxa'].rolling(window=30, min_periods=2).std().reset_index(0, drop=True)
+    
+    # Diferença absoluta com média móvel
+    df['diff_ma_7d'] = abs(df['taxa'] - df['ma_7d'])
+    df['diff_ma_30d'] = abs(df['taxa'] - df['ma_30d'])
+    
+    # Calcular dias consecutivos
+    df['dias_consecutivos'] = df.groupby('moeda')['taxa'].transform(calcular_dias_consecutivos)
+    
+    # Classificações
+    df['tendencia'] = df['var_7d'].apply(classificar_tendencia)
+    df['intensidade_tendencia'] = df['var_7d'].apply(classificar_intensidade)
+    df['momentum'] = df.apply(lambda row: classificar_momentum(row['var_1d'], row['var_7d']), axis=1)
+    
+    # Status vs médias móveis
+    df['status_ma_7d'] = df.apply(lambda row: 'acima' if row['taxa'] > row['ma_7d'] else 'abaixo', axis=1)
+    df['status_ma_30d'] = df.apply(lambda row: 'acima' if row['taxa'] > row['ma_30d'] else 'abaixo', axis=1)
+    
+    # Categoria de variação
+    df['categoria_variacao'] = df['volatilidade_7d'].apply(classificar_volatilidade)
+    
+    return df
+
+def processar_lote(silver_path, lote, codes, schema):
+    """Lê do silver as moedas do lote e devolve as tabelas gold e de pirâmide correspondentes"""
+    # O silver é ordenado por moeda e gravado em grupos de linhas limitados, então o filtro
+    # por faixa de moedas usa as estatísticas dos grupos e só lê os grupos do lote
+    filtro = (ds.field('moeda') >= lote[0]) & (ds.field('moeda') <= lote[-1])
+    tabela = ds.dataset(silver_path, format='parquet').to_table(filter=filtro)
+    df = calcular_indicadores(tabela.to_pandas())
+    df = df.merge(codes, left_on='moeda', right_on='moeda', how='left')
+    piramide = pa.concat_tables([construir_piramide(dados) for _, dados in df.groupby('moeda')])
+    return pa.Table.from_pandas(df, schema=schema, preserve_index=False), piramide
+
+def montar_lotes(contagem, linhas_por_lote=LINHAS_POR_LOTE):
+    """Agrupa moedas consecutivas em lotes de até linhas_por_lote registros"""
+    lotes, atual, linhas = [], [], 0
+    for moeda in sorted(contagem):
+        if atual and linhas + contagem[moeda] > linhas_por_lote:
+            lotes.append(atual)
+            atual, linhas = [], 0
+        atual.append(moeda)
+        linhas += contagem[moeda]
+    if atual:
+        lotes.append(atual)
+    return lotes
+
+def main(max_workers=None, base_dir=None):
+    tmp_paths = []
     try:
         logger.info("Iniciando transformação dos dados para gold layer")
         
-        BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        BASE_DIR = base_dir or os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
         silver_path = os.path.join(BASE_DIR, 'data', 'silver', 'silver.parquet')
         silver_code_path = os.path.join(BASE_DIR, 'data', 'silver', 'currency_code_country.csv')
         gold_path = os.path.join(BASE_DIR, 'data', 'gold', 'gold.parquet')
+        piramide_path = os.path.join(BASE_DIR, 'data', 'gold', 'gold_piramide.parquet')
         
         logger.info(f"Arquivo silver: {silver_path}")
         logger.info(f"Arquivo códigos: {silver_code_path}")
         logger.info(f"Arquivo gold: {gold_path}")
+        logger.info(f"Arquivo pirâmide: {piramide_path}")
         
         # Verificar se arquivos existem
         if not os.path.exists(silver_path):
@@ -87,53 +184,15 @@ def main():
             logger.error(f"Arquivo de códigos não encontrado: {silver_code_path}")
             raise FileNotFoundError(f"Arquivo não encontrado: {silver_code_path}")
         
-        # Carregar dados
-        logger.info("Carregando dados do silver layer")
-        df = pd.read_parquet(silver_path)
-        logger.info(f"Dados silver carregados: {len(df)} registros, {len(df['moeda'].unique())} moedas únicas")
-        
-        logger.info("Ordenando dados por moeda e timestamp")
-        df = df.sort_values(['moeda', 'timestamp'])
-        
-        # Calcular variações percentuais
-        logger.info("Calculando variações percentuais")
-        df['var_1d'] = df.groupby('moeda')['taxa'].pct_change(1) * 100
-        df['var_7d'] = df.groupby('moeda')['taxa'].pct_change(7) * 100
-        df['var_30d'] = df.groupby('moeda')['taxa'].pct_change(30) * 100
-        
-        # Calcular médias móveis
-        logger.info("Calculando médias móveis")
-        df['ma_7d'] = df.groupby('moeda')['taxa'].rolling(window=7, min_periods=1).mean().reset_index(0, drop=True)
-        df['ma_30d'] = df.groupby('moeda')['taxa'].rolling(window=30, min_periods=1).mean().reset_index(0, drop=True)
-        
-        # Calcular volatilidade
-        logger.info("Calculando volatilidade")
-        df['volatilidade_7d'] = df.groupby('moeda')['taxa'].rolling(window=7, min_periods=2).std().reset_index(0, drop=True)
-        df['volatilidade_30d'] = df.groupby('moeda')['taxa'].rolling(window=30, min_periods=2).std().reset_index(0, drop=True)
-        
-        # Diferença absoluta com média móvel
-        logger.info("Calculando diferenças com médias móveis")
-        df['diff_ma_7d'] = abs(df['taxa'] - df['ma_7d'])
-        df['diff_ma_30d'] = abs(df['taxa'] - df['ma_30d'])
-        
-        # Calcular dias consecutivos
-        logger.info("Calculando dias consecutivos")
-        df['dias_consecutivos'] = df.groupby('moeda')['taxa'].transform(calcular_dias_consecutivos)
-        
-        # Classificações
-        logger.info("Aplicando classificações de tendência")
-        df['tendencia'] = df['var_7d'].apply(classificar_tendencia)
-        df['intensidade_tendencia'] = df['var_7d'].apply(classificar_intensidade)
-        df['momentum'] = df.apply(lambda row: classificar_momentum(row['var_1d'], row['var_7d']), axis=1)
-        
-        # Status vs médias móveis
-        logger.info("Calculando status vs médias móveis")
-        df['status_ma_7d'] = df.apply(lambda row: 'acima' if row['taxa'] > row['ma_7d'] else 'abaixo', axis=1)
-        df['status_ma_30d'] = df.apply(lambda row: 'acima' if row['taxa'] > row['ma_30d'] else 'abaixo', axis=1)
-        
-        # Categoria de variação
-        logger.info("Classificando volatilidade")
-        df['categoria_variacao'] = df['volatilidade_7d'].apply(classificar_volatilidade)
+        # Contar registros por moeda lendo apenas a coluna moeda, em blocos
+        logger.info("Contando registros por moeda no silver layer")
+        silver = ds.dataset(silver_path, format='parquet')
+        contagem = {}
+        for bloco in silver.to_batches(columns=['moeda']):
+            for item in pc.value_counts(bloco.column('moeda')).to_pylist():
+                contagem[item['values']] = contagem.get(item['values'], 0) + item['counts']
+        lotes = montar_lotes(contagem)
+        logger.info(f"Moedas únicas no silver: {len(contagem)}, em {len(lotes)} lotes")
         
         # Carregar códigos das moedas
         logger.info("Carregando códigos das moedas")
@@ -141,34 +200,61 @@ def main():
         codes.columns = ['moeda','nm_moeda','nm_pais_en']
         logger.info(f"Códigos carregados: {len(codes)} registros")
         
-        # Fazer merge
-        logger.info("Fazendo merge com códigos das moedas")
-        df_before_merge = len(df)
-        df0 = df.merge(codes, left_on='moeda', right_on='moeda', how='left')
-        df_after_merge = len(df0)
-        
-        if df_before_merge != df_after_merge:
-            logger.warning(f"Mudança no número de registros após merge: {df_before_merge} -> {df_after_merge}")
-        
-        # Verificar moedas sem match
-        moedas_sem_codigo = df0[df0['nm_moeda'].isna()]['moeda'].unique()
-        if len(moedas_sem_codigo) > 0:
-            logger.warning(f"Moedas sem código encontrado: {list(moedas_sem_codigo)}")
+        schema = pa.schema(list(silver.schema) + [pa.field(nome, tipo) for nome, tipo in COLUNAS_GOLD])
         
         # Criar diretório gold se necessário
         os.makedirs(os.path.dirname(gold_path), exist_ok=True)
         logger.info(f"Diretório gold criado/verificado: {os.path.dirname(gold_path)}")
         
-        # Salvar arquivo gold
-        logger.info("Salvando arquivo gold")
-        df0.to_parquet(gold_path, index=False)
-        logger.info(f"Arquivo gold salvo com {len(df0)} registros: {gold_path}")
+        # Processar lotes em paralelo, gravando cada um como um grupo de linhas assim que fica pronto.
+        # O número de lotes em memória é limitado pela janela de tarefas pendentes.
+        max_workers = max(1, min(max_workers or os.cpu_count() or 1, len(lotes)))
+        janela = 2 * max_workers
+        logger.info(f"Calculando indicadores por lote de moedas com {max_workers} processos")
+        
+        total_registros = 0
+        moedas_sem_codigo = []
+        ts_min = ts_max = None
+        tmp_path = f"{gold_path}.tmp"
+        tmp_piramide_path = f"{piramide_path}.tmp"
+        tmp_paths = [tmp_path, tmp_piramide_path]
+        
+        with ProcessPoolExecutor(max_workers=max_workers) as executor, \
+                pq.ParquetWriter(tmp_path, schema) as writer, \
+                pq.ParquetWriter(tmp_piramide_path, SCHEMA_PIRAMIDE) as writer_piramide:
+            pendentes = deque()
+            for i, lote in enumerate(lotes):
+                pendentes.append(executor.submit(processar_lote, silver_path, lote, codes, schema))
+                # Gravar na ordem dos lotes para manter o arquivo ordenado por moeda e timestamp
+                while pendentes and (len(pendentes) >= janela or i == len(lotes) - 1):
+                    tabela, piramide = pendentes.popleft().result()
+                    writer.write_table(tabela, row_group_size=LINHAS_POR_LOTE)
+                    writer_piramide.write_table(piramide, row_group_size=LINHAS_POR_LOTE)
+                    
+                    total_registros += tabela.num_rows
+                    sem_codigo = pc.filter(tabela['moeda'], pc.is_null(tabela['nm_moeda']))
+                    moedas_sem_codigo.extend(pc.unique(sem_codigo).to_pylist())
+                    minmax = pc.min_max(tabela['timestamp']).as_py()
+                    ts_min = minmax['min'] if ts_min is None else min(ts_min, minmax['min'])
+                    ts_max = minmax['max'] if ts_max is None else max(ts_max, minmax['max'])
+        
+        # Cada arquivo é substituído de forma atômica, mas não os dois juntos. A pirâmide,
+        # derivada do gold, é trocada antes e o gold por último, então quem detecta um
+        # gold novo já encontra a pirâmide correspondente.
+        os.replace(tmp_piramide_path, piramide_path)
+        os.replace(tmp_path, gold_path)
+        logger.info(f"Arquivo gold salvo com {total_registros} registros: {gold_path}")
+        logger.info(f"Pirâmide de resolução salva: {piramide_path}")
+        
+        # Verificar moedas sem match
+        if len(moedas_sem_codigo) > 0:
+            logger.warning(f"Moedas sem código encontrado: {moedas_sem_codigo}")
         
         # Estatísticas finais
         logger.info("=== ESTATÍSTICAS FINAIS ===")
-        logger.info(f"Total de registros: {len(df0)}")
-        logger.info(f"Moedas únicas: {len(df0['moeda'].unique())}")
-        logger.info(f"Período: {df0['timestamp'].min()} a {df0['timestamp'].max()}")
+        logger.info(f"Total de registros: {total_registros}")
+        logger.info(f"Moedas únicas: {len(contagem)}")
+        logger.info(f"Período: {ts_min} a {ts_max}")
         logger.info("Transformação para gold layer concluída com sucesso")
         
     except FileNotFoundError as e:
@@ -180,6 +266,11 @@ def main():
     except Exception as e:
         logger.error(f"Erro inesperado: {e}")
         raise
+    finally:
+        # Não deixar arquivos temporários para trás se algum lote falhar
+        for tmp in tmp_paths:
+            if os.path.exists(tmp):
+                os.remove(tmp)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,128 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection
+from urllib.parse import urlencode, urlparse
+import numpy as np
+from query.rate_index import IndiceTaxas
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+class ClienteHTTP:
+    """Cliente do serviço de consulta com uma conexão persistente por thread"""
+
+    def __init__(self, url):
+        self.endereco = urlparse(url).netloc
+        self._local = threading.local()
+
+    def get(self, rota, params=None):
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None:
+            conexao = self._local.conexao = HTTPConnection(self.endereco)
+        conexao.request('GET', f"/{rota}?{urlencode(params or {})}")
+        resposta = conexao.getresponse()
+        corpo = resposta.read()
+        # 404 de data sem cotação também é uma resposta válida
+        if resposta.status not in (200, 404):
+            raise RuntimeError(f"/{rota} respondeu {resposta.status}: {corpo[:200]!r}")
+        return corpo
+
+def dias_por_moeda_local(indice):
+    return {
+        moeda: [str(r['timestamp'].date()) for r in indice.intervalo(moeda, '1900-01-01', '2999-12-31')]
+        for moeda in indice.moedas()
+    }
+
+def dias_por_moeda_http(cliente):
+    moedas = json.loads(cliente.get('moedas'))
+    return {
+        moeda: [r['timestamp'][:10] for r in json.loads(cliente.get('intervalo', {'moeda': moeda, 'inicio': '1900-01-01', 'fim': '2999-12-31'}))]
+        for moeda in moedas
+    }
+
+def gerar_consultas(dias_por_moeda, n, seed=42):
+    """Sorteia consultas de ponto, intervalo e últimos a partir das datas existentes no gold"""
+    rng = random.Random(seed)
+    moedas = sorted(m for m, dias in dias_por_moeda.items() if dias)
+    consultas = []
+    for _ in range(n):
+        moeda = rng.choice(moedas)
+        dia = np.datetime64(rng.choice(dias_por_moeda[moeda]))
+        tipo = rng.choice(['taxa', 'intervalo', 'ultimos'])
+        if tipo == 'taxa':
+            consultas.append(('taxa', {'moeda': moeda, 'data': str(dia)}))
+        elif tipo == 'intervalo':
+            consultas.append(('intervalo', {'moeda': moeda, 'inicio': str(dia), 'fim': str(dia + 30)}))
+        else:
+            consultas.append(('ultimos', {'moedas': ','.join(rng.sample(moedas, min(7, len(moedas))))}))
+    return consultas
+
+def executar_local(indice, tipo, params):
+    if tipo == 'taxa':
+        return indice.taxa(params['moeda'], params['data'])
+    if tipo == 'intervalo':
+        return indice.intervalo(params['moeda'], params['inicio'], params['fim'])
+    return indice.ultimos(params['moedas'].split(','))
+
+def medir(consultas, executar, concorrencia):
+    """Executa as consultas e devolve latências (s) por tipo e a duração total"""
+    def cronometrar(consulta):
+        inicio = time.perf_counter()
+        executar(*consulta)
+        return consulta[0], time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    if concorrencia == 1:
+        resultados = [cronometrar(c) for c in consultas]
+    else:
+        with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+            resultados = list(executor.map(cronometrar, consultas))
+    duracao = time.perf_counter() - inicio
+
+    latencias = {}
+    for tipo, latencia in resultados:
+        latencias.setdefault(tipo, []).append(latencia)
+    return latencias, duracao
+
+def relatorio(latencias, duracao):
+    total = sum(len(v) for v in latencias.values())
+    logger.info(f"Consultas: {total} em {duracao:.2f} s ({total / duracao:,.0f} consultas/s)")
+    for tipo in sorted(latencias):
+        valores = np.array(latencias[tipo]) * 1e6
+        logger.info(
+            f"{tipo:>10}: n={len(valores)} p50={np.percentile(valores, 50):.1f} µs "
+            f"p99={np.percentile(valores, 99):.1f} µs max={valores.max():.1f} µs"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description='Teste de carga das consultas de taxa')
+    parser.add_argument('--consultas', type=int, default=50_000)
+    parser.add_argument('--concorrencia', type=int, default=1)
+    parser.add_argument('--url', help='URL do serviço HTTP (ex.: http://127.0.0.1:8000); sem ela, mede a biblioteca')
+    args = parser.parse_args()
+
+    if args.url:
+        cliente = ClienteHTTP(args.url)
+        consultas = gerar_consultas(dias_por_moeda_http(cliente), args.consultas)
+        logger.info(f"Medindo serviço HTTP em {args.url} com concorrência {args.concorrencia}")
+        executar = lambda tipo, params: cliente.get(tipo, params)
+    else:
+        indice = IndiceTaxas()
+        consultas = gerar_consultas(dias_por_moeda_local(indice), args.consultas)
+        logger.info(f"Medindo biblioteca em processo com concorrência {args.concorrencia}")
+        executar = lambda tipo, params: executar_local(indice, tipo, params)
+
+    # Aquecimento para não medir caches e conexões frios
+    medir(consultas[:1000], executar, 1)
+    relatorio(*medir(consultas, executar, args.concorrencia))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+import time
+from datetime import date, datetime, timedelta
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+GOLD_PATH = os.path.join(BASE_DIR, 'data', 'gold', 'gold.parquet')
+
+# Colunas devolvidas pela consulta de últimos indicadores
+COLUNAS_INDICADORES = [
+    'moeda', 'taxa', 'timestamp', 'var_1d', 'var_7d', 'var_30d', 'ma_7d', 'ma_30d',
+    'volatilidade_7d', 'volatilidade_30d', 'tendencia', 'intensidade_tendencia',
+    'momentum', 'status_ma_7d', 'status_ma_30d', 'categoria_variacao',
+]
+
+NS_POR_DIA = 86_400_000_000_000
+ORDINAL_EPOCA = date(1970, 1, 1).toordinal()
+EPOCA = datetime(1970, 1, 1)
+NS_POR_UNIDADE = {'s': 1_000_000_000, 'ms': 1_000_000, 'us': 1_000, 'ns': 1}
+
+def _inicio_do_dia_ns(dia):
+    """Converte uma data em nanossegundos desde a época, à meia-noite"""
+    if isinstance(dia, str):
+        dia = date.fromisoformat(dia)
+    return (dia.toordinal() - ORDINAL_EPOCA) * NS_POR_DIA
+
+def _decodificar(coluna):
+    """Converte uma coluna Arrow em (array numpy, tradução de cada valor para Python)"""
+    if pa.types.is_string(coluna.type) or pa.types.is_large_string(coluna.type):
+        # Textos viram códigos inteiros; -1 (nulo) aponta para o None no fim do dicionário
+        codificada = coluna.combine_chunks().dictionary_encode()
+        valores = codificada.dictionary.to_pylist() + [None]
+        return pc.fill_null(codificada.indices, -1).to_numpy(), valores.__getitem__
+    if pa.types.is_timestamp(coluna.type):
+        fator = NS_POR_UNIDADE[coluna.type.unit]
+        ns = coluna.cast(pa.int64()).to_numpy() * fator
+        return ns, lambda v: EPOCA + timedelta(microseconds=v // 1000)
+    # Reais (NaN vira None na leitura) e inteiros já saem prontos do numpy
+    return coluna.to_numpy(), None
+
+def _derivar_arrow(gold_path, stat):
+    """Garante ao lado do gold uma cópia Arrow IPC sem compressão gerada a partir dele"""
+    arrow_path = os.path.splitext(gold_path)[0] + '.arrow'
+    origem = {'origem_tamanho': str(stat.st_size), 'origem_mtime_ns': str(stat.st_mtime_ns)}
+
+    # A cópia guarda o tamanho e a data do parquet de origem; se batem, pode ser reusada
+    if os.path.exists(arrow_path):
+        try:
+            metadata = pa.ipc.open_file(pa.memory_map(arrow_path, 'r')).schema.metadata or {}
+            if {k.decode(): v.decode() for k, v in metadata.items()} == origem:
+                return arrow_path
+        except pa.ArrowInvalid:
+            logger.warning(f"Cópia arrow inválida, gerando novamente: {arrow_path}")
+
+    logger.info(f"Gerando cópia arrow do gold: {arrow_path}")
+    arquivo = pq.ParquetFile(gold_path)
+    tmp_path = f"{arrow_path}.{os.getpid()}.tmp"
+    try:
+        with pa.ipc.new_file(tmp_path, arquivo.schema_arrow.with_metadata(origem)) as writer:
+            for lote in arquivo.iter_batches():
+                writer.write_batch(lote)
+        os.replace(tmp_path, arrow_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return arrow_path
+
+def _sem_nan(v):
+    return None if v != v else v
+
+def _identidade(v):
+    return v
+
+class _Snapshot:
+    """Versão imutável do gold em matrizes numpy, com índice (moeda, timestamp)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.stat = os.stat(path)
+
+        # O arquivo IPC não é comprimido, então a leitura via mmap não decodifica nada.
+        # As colunas são então decodificadas uma vez para duas matrizes por linha
+        # (reais e inteiros), porque ler valores escalares do Arrow custa alguns
+        # microssegundos por valor e fatiar coluna a coluna custa quase o mesmo.
+        arrow_path = _derivar_arrow(path, self.stat)
+        tabela = pa.ipc.open_file(pa.memory_map(arrow_path, 'r')).read_all()
+        self.num_registros = tabela.num_rows
+        self.nomes = tabela.column_names
+        colunas = {nome: _decodificar(tabela.column(nome)) for nome in self.nomes}
+
+        nomes_reais = [n for n in self.nomes if colunas[n][0].dtype.kind == 'f']
+        nomes_inteiros = [n for n in self.nomes if n not in nomes_reais]
+        self.reais = np.column_stack([colunas[n][0] for n in nomes_reais])
+        self.inteiros = np.column_stack([colunas[n][0].astype(np.int64) for n in nomes_inteiros])
+
+        # Para cada coluna: posição na linha (reais + inteiros) e tradução para Python
+        self.plano = {}
+        for k, nome in enumerate(nomes_reais + nomes_inteiros):
+            traduzir = colunas[nome][1] or (_sem_nan if nome in nomes_reais else _identidade)
+            self.plano[nome] = (k, traduzir)
+
+        # O gold está ordenado por moeda e timestamp
+        moedas = tabela.column('moeda').to_numpy(zero_copy_only=False)
+        self.timestamps = colunas['timestamp'][0]
+
+        self.faixas = {}
+        if self.num_registros == 0:
+            return
+        inicios = np.flatnonzero(np.r_[True, moedas[1:] != moedas[:-1]])
+        fins = np.r_[inicios[1:], len(moedas)]
+        for inicio, fim in zip(inicios, fins):
+            moeda = moedas[inicio]
+            if moeda in self.faixas:
+                raise ValueError(f"Gold não está ordenado por moeda: {moeda} aparece fora de sequência")
+            self.faixas[moeda] = (int(inicio), int(fim))
+
+    def linhas(self, inicio, fim, colunas=None):
+        plano = [(nome, *self.plano[nome]) for nome in (colunas or self.nomes)]
+        return [
+            {nome: traduzir(linha[k]) for nome, k, traduzir in plano}
+            for linha in map(list.__add__, self.reais[inicio:fim].tolist(), self.inteiros[inicio:fim].tolist())
+        ]
+
+class IndiceTaxas:
+    """Consultas de taxa por (moeda, data) sobre o gold, com recarga atômica"""
+
+    def __init__(self, path=GOLD_PATH, intervalo_verificacao=1.0):
+        if not os.path.exists(path):
+            logger.error(f"Arquivo gold não encontrado: {path}")
+            raise FileNotFoundError(f"Arquivo não encontrado: {path}")
+
+        self.path = path
+        self.intervalo_verificacao = intervalo_verificacao
+        self._lock = threading.Lock()
+        self._proxima_verificacao = 0.0
+        self._recarregando = False
+        self._snapshot = self._carregar()
+
+    def _carregar(self):
+        inicio = time.perf_counter()
+        snapshot = _Snapshot(self.path)
+        duracao = (time.perf_counter() - inicio) * 1000
+        logger.info(f"Gold carregado: {snapshot.num_registros} registros, {len(snapshot.faixas)} moedas em {duracao:.1f} ms")
+        return snapshot
+
+    def _recarregar(self):
+        try:
+            self._snapshot = self._carregar()
+        except Exception as e:
+            logger.error(f"Erro ao recarregar gold, mantendo versão anterior: {e}")
+        finally:
+            self._recarregando = False
+
+    def _atual(self):
+        """Devolve o snapshot vigente, disparando a recarga se o gold foi trocado"""
+        agora = time.monotonic()
+        if agora < self._proxima_verificacao:
+            return self._snapshot
+
+        with self._lock:
+            if agora >= self._proxima_verificacao and not self._recarregando:
+                self._proxima_verificacao = agora + self.intervalo_verificacao
+                try:
+                    stat = os.stat(self.path)
+                    antigo = self._snapshot.stat
+                    if (stat.st_ino, stat.st_mtime_ns, stat.st_size) != (antigo.st_ino, antigo.st_mtime_ns, antigo.st_size):
+                        logger.info("Novo arquivo gold detectado, recarregando em segundo plano")
+                        # A consulta que detectou a troca não espera: o snapshot novo é montado
+                        # em outra thread e as consultas seguem no antigo até a troca da referência
+                        self._recarregando = True
+                        threading.Thread(target=self._recarregar, daemon=True).start()
+                except OSError as e:
+                    logger.error(f"Erro ao verificar arquivo gold: {e}")
+        return self._snapshot
+
+    def moedas(self):
+        return sorted(self._atual().faixas)
+
+    def taxa(self, moeda, dia):
+        """Registro da moeda na data informada, ou None se não houver cotação nesse dia
+
+        O gold pode ter mais de uma cotação no mesmo dia (ex.: 00:00:01 e 21:00:01);
+        nesse caso é devolvida a última do dia.
+        """
+        snap = self._atual()
+        if moeda not in snap.faixas:
+            return None
+        inicio, fim = snap.faixas[moeda]
+        dia_ns = _inicio_do_dia_ns(dia)
+        i = inicio + int(np.searchsorted(snap.timestamps[inicio:fim], dia_ns + NS_POR_DIA, side='left')) - 1
+        if i < inicio or snap.timestamps[i] < dia_ns:
+            return None
+        return snap.linhas(i, i + 1)[0]
+
+    def intervalo(self, moeda, inicio_dia, fim_dia):
+        """Registros da moeda entre as duas datas, inclusive"""
+        snap = self._atual()
+        if moeda not in snap.faixas:
+            return []
+        inicio, fim = snap.faixas[moeda]
+        ts = snap.timestamps[inicio:fim]
+        a = inicio + int(np.searchsorted(ts, _inicio_do_dia_ns(inicio_dia), side='left'))
+        b = inicio + int(np.searchsorted(ts, _inicio_do_dia_ns(fim_dia) + NS_POR_DIA, side='left'))
+        return snap.linhas(a, b)
+
+    def ultimos(self, moedas):
+        """Últimos indicadores disponíveis para cada moeda pedida"""
+        snap = self._atual()
+        return {
+            moeda: snap.linhas(snap.faixas[moeda][1] - 1, snap.faixas[moeda][1], COLUNAS_INDICADORES)[0]
+            for moeda in moedas if moeda in snap.faixas
+        }
@@ -0,0 +1,80 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from dotenv import load_dotenv
+from query.rate_index import IndiceTaxas
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+def criar_handler(indice):
+    class Handler(BaseHTTPRequestHandler):
+        """Rotas: /taxa?moeda=&data=, /intervalo?moeda=&inicio=&fim=, /ultimos?moedas=A,B"""
+
+        # Mantém a conexão aberta entre consultas; toda resposta envia Content-Length.
+        # Sem Nagle, cabeçalho e corpo não esperam o ACK atrasado do cliente (~40 ms)
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def _responder(self, status, corpo):
+            dados = json.dumps(corpo, default=str, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(dados)))
+            self.end_headers()
+            self.wfile.write(dados)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {chave: valores[0] for chave, valores in parse_qs(url.query).items()}
+            try:
+                if url.path == '/taxa':
+                    resultado = indice.taxa(params['moeda'].upper(), params['data'])
+                    if resultado is None:
+                        return self._responder(404, {'erro': 'Cotação não encontrada'})
+                    return self._responder(200, resultado)
+                if url.path == '/intervalo':
+                    return self._responder(200, indice.intervalo(params['moeda'].upper(), params['inicio'], params['fim']))
+                if url.path == '/ultimos':
+                    moedas = [m.strip().upper() for m in params['moedas'].split(',') if m.strip()]
+                    return self._responder(200, indice.ultimos(moedas))
+                if url.path == '/moedas':
+                    return self._responder(200, indice.moedas())
+                return self._responder(404, {'erro': f'Rota desconhecida: {url.path}'})
+            except KeyError as e:
+                return self._responder(400, {'erro': f'Parâmetro obrigatório ausente: {e}'})
+            except ValueError as e:
+                return self._responder(400, {'erro': f'Parâmetro inválido: {e}'})
+            except Exception as e:
+                logger.error(f"Erro inesperado na consulta {self.path}: {e}")
+                return self._responder(500, {'erro': 'Erro interno'})
+
+        def log_message(self, format, *args):
+            # Sem log por requisição, para não pesar na latência
+            pass
+
+    return Handler
+
+def main():
+    try:
+        load_dotenv()
+        host = os.getenv('QUERY_HOST', '127.0.0.1')
+        port = int(os.getenv('QUERY_PORT', '8000'))
+
+        indice = IndiceTaxas()
+        servidor = ThreadingHTTPServer((host, port), criar_handler(indice))
+        logger.info(f"Serviço de consulta ouvindo em http://{host}:{port}")
+        servidor.serve_forever()
+
+    except FileNotFoundError as e:
+        logger.error(f"Arquivo não encontrado: {e}")
+        raise
+    except KeyboardInterrupt:
+        logger.info("Serviço de consulta encerrado")
+
+if __name__ == "__main__":
+    main()
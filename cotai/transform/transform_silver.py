@@ -9,6 +9,10 @@ from utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+# Registros por grupo de linhas do silver; com o arquivo ordenado por moeda, o gold
+# lê só os grupos das moedas que está processando
+LINHAS_POR_GRUPO = 16_384
+
 def main():
     try:
         logger.info("Iniciando transformação dos dados para silver layer")
@@ -88,8 +92,9 @@ def main():
             logger.info("Primeiro arquivo silver, criando novo")
             df_combined = df_new
         
-        # Salvar arquivo final
-        df_combined.to_parquet(silver_path, index=False)
+        # Salvar arquivo final ordenado por moeda e timestamp
+        df_combined = df_combined.sort_values(['moeda', 'timestamp']).reset_index(drop=True)
+        df_combined.to_parquet(silver_path, index=False, row_group_size=LINHAS_POR_GRUPO)
         logger.info(f"Arquivo silver salvo com {len(df_combined)} registros: {silver_path}")
         logger.info("Transformação para silver layer concluída com sucesso")
         